@@ -3,11 +3,12 @@
 
 
 # aggregation2.py
+import numpy as np
 import pandas as pd
 from means import (
-    trimmed_mean_prob,
-    geometric_mean_prob,
-    geometric_mean_odds,
+    trimmed_mean_prob_by_group,
+    geometric_mean_prob_by_group,
+    geometric_mean_odds_by_group,
 )
 from carry_forward import carry_forward_snapshots
 
@@ -35,31 +36,52 @@ def aggregate_across_forecasters(snapshots):
         ]
         return pd.DataFrame(columns=cols)
 
+    keys = ["discover question id", "day", "answer sort order"]
+
+    # Distinct forecasters per bucket: de-duplicate once, then count rows
+    # (a missing guid isn't a forecaster, as with nunique)
+    n_forecasters = (
+        snapshots[keys + ["membership guid"]]
+        .dropna(subset=["membership guid"])
+        .drop_duplicates()
+        .groupby(keys, observed=True)
+        .size()
+    )
+
+    gb = snapshots.groupby(keys, observed=True)
+    agg = gb.agg(
+        mean_probability=("prob", "mean"),
+        median_probability=("prob", "median"),
+        resolved_probability=("resolved_probability", "first"),  # constant per (qid, answer)
+    )
+
+    # The custom means run over all groups at once, keyed by each row's group
+    # number (same order as agg's rows)
+    codes = gb.ngroup()
+    in_group = codes.notna().to_numpy()
+    codes = codes.to_numpy()[in_group].astype(np.int64)
+    probs = snapshots["prob"].to_numpy()[in_group]
+    agg["trimmed_mean_probability"] = trimmed_mean_prob_by_group(probs, codes, len(agg))
+    agg["geometric_mean_probability"] = geometric_mean_prob_by_group(probs, codes, len(agg))
+    agg["geometric_mean_odds"] = geometric_mean_odds_by_group(probs, codes, len(agg))
+    agg["n_forecasters"] = n_forecasters.reindex(agg.index, fill_value=0)
     agg = (
-        snapshots
-        .groupby(["discover question id", "day", "answer sort order"], as_index=False)
-        .agg(
-            mean_probability=("prob", "mean"),
-            median_probability=("prob", "median"),
-            trimmed_mean_probability=("prob", trimmed_mean_prob),
-            geometric_mean_probability=("prob", geometric_mean_prob),
-            geometric_mean_odds=("prob", geometric_mean_odds),
-            n_forecasters=("membership guid", "nunique"),
-            resolved_probability=("resolved_probability", "first"),  # constant per (qid, answer)
-        )
+        agg[_PROB_COLS + ["n_forecasters", "resolved_probability"]]
+        .reset_index()
         .rename(columns={"answer sort order": "answer_sort_order"})
         .sort_values(["discover question id", "day", "answer_sort_order"], kind="stable")
         .reset_index(drop=True)
     )
 
     # Vectorized renormalization within (qid, day), skip if only one bucket
-    sizes = agg.groupby(["discover question id", "day"])["answer_sort_order"].transform("size")
-    multi_bucket = sizes > 1
+    gb = agg.groupby(["discover question id", "day"], sort=False, observed=True)
+    sizes = gb["answer_sort_order"].transform("size").to_numpy()
+    totals = gb[_PROB_COLS].transform("sum").to_numpy(dtype=float)
+    mask = (sizes > 1)[:, None] & (totals > 0)
 
-    for col in _PROB_COLS:
-        totals = agg.groupby(["discover question id", "day"])[col].transform("sum")
-        mask = (multi_bucket) & (totals > 0)
-        agg.loc[mask, col] = agg.loc[mask, col] / totals[mask]
+    vals = agg[_PROB_COLS].to_numpy(dtype=float, copy=True)
+    np.divide(vals, totals, out=vals, where=mask)
+    agg[_PROB_COLS] = vals
 
     # Downcast to save memory
     for col in _PROB_COLS:
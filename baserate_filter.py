@@ -7,6 +7,9 @@
 
 import re
 
+import numpy as np
+import pandas as pd
+
 # Matches: "base rate(s)", "base-rate(s)", "reference class(es)", "reference-class(es)"
 KEYWORD_RE = re.compile(r"(?i)\bbase[-\s]?rates?\b|\breference[-\s]?class(?:es)?\b")
 
@@ -26,9 +29,20 @@ def keyword_guids(
         raise ValueError(f"Missing column: {guid_col!r}")
 
     s = df[rationale_col].astype(str).fillna("")
-    hits = s.str.contains(pattern, regex=True, na=False)
-    counts = df.assign(_hit=hits).groupby(guid_col, observed=True)["_hit"].sum()
-    return set(counts[counts >= min_hits].index)
+
+    # Rationales repeat a lot: match each distinct text once, then map back
+    pattern = re.compile(pattern)
+    codes, uniq = pd.factorize(s)
+    hits_unique = np.fromiter(
+        (pattern.search(x) is not None for x in uniq), dtype=bool, count=len(uniq)
+    )
+    hits = hits_unique[codes]
+
+    # Hits per guid without copying the frame (missing guids are skipped)
+    guid_codes, guids = pd.factorize(df[guid_col])
+    has_guid = guid_codes >= 0
+    counts = np.bincount(guid_codes[has_guid], weights=hits[has_guid], minlength=len(guids))
+    return set(guids[counts >= min_hits])
 
 
 def filter_by_rationale(
@@ -3,7 +3,6 @@
 
 
 import pandas as pd
-import numpy as np
 
 def build_paper_table(day_scores: pd.DataFrame) -> pd.DataFrame:
     """
@@ -21,18 +20,19 @@ def build_paper_table(day_scores: pd.DataFrame) -> pd.DataFrame:
         "obs_geom_odds":   "Geometric mean (odds)",
     }
 
-    rows = []
-    for col, pretty_name in methods.items():
-        vals = day_scores[col].to_numpy(dtype=float)
-
-        rows.append({
-            "Method": pretty_name,
-            "Ordered Brier (avg)": np.mean(vals),
-            "Std dev across days": np.std(vals, ddof=1),
-            "N question-days": vals.size,
+    # all method columns at once (pandas std is ddof=1); NaN day scores
+    # propagate, so the avg/std always cover all N question-days
+    scores = day_scores[list(methods)].astype(float)
+    out = (
+        pd.DataFrame({
+            "Ordered Brier (avg)": scores.mean(skipna=False),
+            "Std dev across days": scores.std(skipna=False),
+            "N question-days": len(scores),
         })
-
-    out = pd.DataFrame(rows)
+        .rename(index=methods)
+        .rename_axis("Method")
+        .reset_index()
+    )
 
     # sort by best (lowest avg score)
     out = out.sort_values("Ordered Brier (avg)").reset_index(drop=True)
@@ -4,9 +4,16 @@
 
 
 
+import numpy as np
 import pandas as pd
 
 
+def _within_cutoff(df, cutoff):
+    # Rows on or before their question's cutoff day; no cutoff means keep
+    q_cutoff = df["discover question id"].map(cutoff)
+    return df[q_cutoff.isna() | (df["day"] <= q_cutoff)]
+
+
 #This function is needed to keep things more efficient because otherwise
 # the kernel gets killed on my laptop, it carries forward forecasts for scoring as
 # is canonical to do in these kinds of settings
@@ -17,104 +24,152 @@ def carry_forward_snapshots(
     max_staleness_days=None,
     per_answer_cols=("resolved_probability",),
     per_question_cols=(),
+    per_question_day_cutoff=None,
     downcast=True,
 ):
     """
-    Build per-day carried-forward snapshots from a compact forecaster_day table,
-    emitting chunks per question to keep peak memory low.
+    Build per-day carried-forward snapshots from a compact forecaster_day table.
+    All questions are carried forward together on flat integer arrays; the
+    snapshot rows are materialized once at the end to keep peak memory low.
+
+    `day` is expected to be floored to calendar days; staleness is counted in
+    whole days. If `per_question_day_cutoff` names a per-question column (e.g.
+    "correctness_known_day"), no snapshots are emitted after that day; questions
+    with a missing cutoff are not cut.
     """
     pa_cols = [c for c in (per_answer_cols or ()) if c in forecaster_day.columns]
     pq_cols = [c for c in (per_question_cols or ()) if c in forecaster_day.columns]
 
     # Per-(qid, answer) lookups (tiny)
-    per_answer_lookup = {}
+    per_answer_lookup = None
     if pa_cols:
-        uniq_pa = forecaster_day.drop_duplicates(
-            ["discover question id", "answer sort order"] + list(pa_cols)
+        per_answer_lookup = (
+            forecaster_day.drop_duplicates(
+                ["discover question id", "answer sort order"] + list(pa_cols)
+            )
+            .drop_duplicates(["discover question id", "answer sort order"], keep="last")
+            .set_index(["discover question id", "answer sort order"])[list(pa_cols)]
         )
-        for _, row in uniq_pa.iterrows():
-            key = (row["discover question id"], row["answer sort order"])
-            per_answer_lookup[key] = {c: row[c] for c in pa_cols}
 
     # Per-question lookups (tiny)
-    per_question_lookup = {}
+    per_question_lookup = None
     if pq_cols:
-        uniq_pq = forecaster_day.drop_duplicates(["discover question id"] + list(pq_cols))
-        for _, row in uniq_pq.iterrows():
-            per_question_lookup[row["discover question id"]] = {c: row[c] for c in pq_cols}
-
-    out_chunks = []
-
-    # Process per question to cap memory
-    for qid, sub_q in forecaster_day.groupby("discover question id", sort=False):
-        rows_q = []
-
-        days_sorted = sorted(pd.unique(sub_q["day"]))
-
-        latest_probs = {}  # (guid, aso) -> prob
-        latest_day = {}    # (guid, aso) -> last update day
-
-        for day in days_sorted:
-            today_rows = sub_q[sub_q["day"] == day]
-
-            # Update state with today's submissions (last-write-wins within the day)
-            
-            for (guid, aso), block in today_rows.groupby(
-                ["membership guid", "answer sort order"], sort=False, observed=True
-            ):
-                latest_probs[(guid, aso)] = float(block["prob"].iloc[-1])
-                latest_day[(guid, aso)] = day
-
-            # Drop stale if requested
-            if max_staleness_days is not None:
-                cutoff = pd.Timedelta(days=max_staleness_days)
-                to_drop = [
-                    k for k, dlast in latest_day.items()
-                    if (pd.Timestamp(day) - pd.Timestamp(dlast)) > cutoff
-                ]
-                for k in to_drop:
-                    latest_day.pop(k, None)
-                    latest_probs.pop(k, None)
-
-            # Emit active entries for this day
-            for (guid, aso), p in latest_probs.items():
-                rec = {
-                    "discover question id": qid,
-                    "membership guid": guid,
-                    "day": day,
-                    "answer sort order": aso,
-                    "prob": p,
-                }
-                if pa_cols:
-                    rec.update(per_answer_lookup.get((qid, aso), {}))
-                if pq_cols:
-                    rec.update(per_question_lookup.get(qid, {}))
-                rows_q.append(rec)
-
-        if rows_q:
-            chunk = pd.DataFrame.from_records(rows_q)
-
-            if downcast:
-                # numeric downcast
-                chunk["prob"] = chunk["prob"].astype("float32")
-                for c in pa_cols + pq_cols:
-                    if c in chunk and pd.api.types.is_float_dtype(chunk[c]):
-                        chunk[c] = chunk[c].astype("float32")
-                # ids as categoricals / small ints
-                for c in ["discover question id", "membership guid"]:
-                    if chunk[c].dtype == object:
-                        chunk[c] = chunk[c].astype("category")
-                if pd.api.types.is_integer_dtype(chunk["answer sort order"]):
-                    chunk["answer sort order"] = chunk["answer sort order"].astype("int16")
-
-            out_chunks.append(chunk)
-
-    if not out_chunks:
+        per_question_lookup = (
+            forecaster_day.drop_duplicates(["discover question id"] + list(pq_cols))
+            .drop_duplicates("discover question id", keep="last")
+            .set_index("discover question id")[list(pq_cols)]
+        )
+
+    keys = ["membership guid", "answer sort order"]
+
+    # Observed submissions, last-write-wins within the day (the grid below
+    # places rows by position, so their order doesn't matter).
+    # Rows missing any part of the (qid, guid, answer) key or the day are
+    # dropped, as a groupby on those keys would.
+    observed = (
+        forecaster_day[["discover question id", "membership guid", "day", "answer sort order", "prob"]]
+        .dropna(subset=["discover question id", "membership guid", "day", "answer sort order"])
+        .drop_duplicates(["discover question id"] + keys + ["day"], keep="last")
+    )
+
+    # Each question's calendar: every day it has a dated row, including rows
+    # whose guid or answer is missing (those aren't carried, but everyone
+    # else's forecasts are still emitted on that day)
+    calendar = forecaster_day[["discover question id", "day"]].dropna().drop_duplicates()
+
+    # Snapshots on a day only depend on submissions up to that day, so cutting
+    # the submissions and the calendar cuts the emitted days too
+    if per_question_day_cutoff is not None:
+        cutoff = (
+            forecaster_day.drop_duplicates(["discover question id", per_question_day_cutoff])
+            .drop_duplicates("discover question id", keep="last")
+            .set_index("discover question id")[per_question_day_cutoff]
+        )
+        observed = _within_cutoff(observed, cutoff)
+        calendar = _within_cutoff(calendar, cutoff)
+    observed = observed.reset_index(drop=True)
+
+    if downcast:
+        # numeric downcast (before rows are replicated)
+        observed["prob"] = observed["prob"].astype("float32")
+        if pd.api.types.is_integer_dtype(observed["answer sort order"]):
+            observed["answer sort order"] = observed["answer sort order"].astype("int16")
+        for lookup in (per_answer_lookup, per_question_lookup):
+            if lookup is not None:
+                for c in lookup.columns:
+                    if pd.api.types.is_float_dtype(lookup[c]):
+                        lookup[c] = lookup[c].astype("float32")
+
+    # Integer codes: question, calendar day, (qid, guid, aso) key. Observed
+    # rows are a subset of the calendar, so its codes cover them.
+    cal_q, qids = pd.factorize(calendar["discover question id"])
+    cal_day, days = pd.factorize(calendar["day"], sort=True)
+    day_ord = days.values.astype("datetime64[D]").astype(np.int32)  # days since epoch
+    q_code = qids.get_indexer(observed["discover question id"])
+    day_code = days.get_indexer(observed["day"])
+    key_code, key_uniques = pd.MultiIndex.from_frame(
+        observed[["discover question id"] + keys]
+    ).factorize()
+
+    key_q = np.empty(len(key_uniques), dtype=np.int64)
+    key_q[key_code] = q_code
+
+    # Each question's active days in calendar order, as (question, day) codes
+    qday = np.unique(cal_q * len(days) + cal_day)
+    qday_code = np.searchsorted(qday, q_code * len(days) + day_code)
+    qday_q, qday_day = np.divmod(qday, len(days))
+    q_len = np.bincount(qday_q, minlength=len(qids))
+    q_start = np.cumsum(q_len) - q_len
+
+    # Flat grid over all questions: one block per key spanning its question's
+    # days; grid positions are int32 unless the grid is too big for it
+    key_len = q_len[key_q]
+    pos_dtype = np.int32 if key_len.sum() < 2**31 else np.int64
+    key_len = key_len.astype(pos_dtype)
+    key_start = np.cumsum(key_len) - key_len
+    obs_pos = key_start[key_code] + (qday_code - q_start[q_code]).astype(pos_dtype)
+
+    # Grid position of each key's latest submission, carried forward
+    last = np.full(key_len.sum(), -1, dtype=pos_dtype)
+    last[obs_pos] = obs_pos
+    np.maximum.accumulate(last, out=last)
+
+    # A key is active from its first submission to the end of its block. Keys
+    # are laid out in code order, so the first position of each run of equal
+    # keys in the sorted submissions is that key's first submission.
+    order = np.argsort(obs_pos)
+    sorted_pos = obs_pos[order]
+    sorted_keys = key_code[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    first_pos = sorted_pos[first]
+    n_emit = key_start + key_len - first_pos
+    emit = np.arange(n_emit.sum(), dtype=pos_dtype)
+    emit += np.repeat(first_pos - (np.cumsum(n_emit) - n_emit), n_emit)
+
+    # Observed row carried into each snapshot row, and the snapshot's day
+    rows = order[np.searchsorted(sorted_pos, last[emit])]
+    k = key_code[rows]
+    emit_days = qday_day[q_start[key_q[k]] + (emit - key_start[k])]
+
+    # Drop stale if requested (plain int compare on days since epoch)
+    if max_staleness_days is not None:
+        fresh = (day_ord[emit_days] - day_ord[day_code[rows]]) <= max_staleness_days
+        rows, emit_days = rows[fresh], emit_days[fresh]
+
+    if not rows.size:
         cols = [
             "discover question id", "membership guid", "day", "answer sort order", "prob"
         ] + pa_cols + pq_cols
         return pd.DataFrame(columns=cols)
 
-    # Concatenate per-question chunks
-    snapshots = pd.concat(out_chunks, ignore_index=True)
+    # Materialize all snapshot rows in one take
+    snapshots = observed.take(rows).reset_index(drop=True)
+    snapshots["day"] = days.take(emit_days)
+    if pa_cols:
+        snapshots = snapshots.join(
+            per_answer_lookup, on=["discover question id", "answer sort order"]
+        )
+    if pq_cols:
+        snapshots = snapshots.join(per_question_lookup, on="discover question id")
     return snapshots
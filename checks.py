@@ -9,16 +9,12 @@
 
 import pandas as pd
 
+from data_cleaner import cached_to_datetime
+
 FILE = "rct-a-prediction-sets.csv"
 SUM_TOL = 1e-3  # tolerance for sum-to-one
 
 def main(path=FILE):
-    # Let pandas infer dtypes; keep defaults for NA handling
-    df = pd.read_csv(path)
-
-    #  strip removes any leading or trailing whitespace in the column names
-    df.rename(columns=lambda c: str(c).strip(), inplace=True)
-
     # Required columns
     req = [
         "prediction set id",
@@ -31,6 +27,14 @@ def main(path=FILE):
         "answer sort order",             
     ]
 
+    # Let pandas infer dtypes; keep defaults for NA handling. Only load the
+    # columns checked below (header names are matched ignoring whitespace).
+    wanted = set(req) | {"created at", "updated at"}
+    df = pd.read_csv(path, usecols=lambda c: str(c).strip() in wanted)
+
+    #  strip removes any leading or trailing whitespace in the column names
+    df.rename(columns=lambda c: str(c).strip(), inplace=True)
+
     missing = [c for c in req if c not in df.columns]
     if missing:
         print("FATAL: missing required columns:", ", ".join(missing))
@@ -38,9 +42,9 @@ def main(path=FILE):
 
     # 1) Nulls in required fields (clean data => mostly NaN-based)
     print("\n[Nulls in required fields]")
+    nulls = df[req].isna().sum(axis=0)
     for c in req:
-        n = int(df[c].isna().sum())
-        print(f"- {c}: {n}")
+        print(f"- {c}: {int(nulls[c])}")
         
         
     qids = df.loc[df["answer resolved probability"].isna(), "discover question id"].dropna().unique().tolist()
@@ -59,8 +63,9 @@ def main(path=FILE):
         print(f"FATAL: 'forecasted probability' is not numeric (dtype={fp.dtype}).")
         return
 
-    bad_prob = df[fp.notna() & ~fp.between(0, 1)]
-    print(f"- rows: {len(bad_prob)}")
+    fp_arr = fp.to_numpy(dtype=float)
+    bad_prob = int(((fp_arr < 0) | (fp_arr > 1)).sum())  # NaN compares False
+    print(f"- rows: {bad_prob}")
 
 
     # 3) Duplicate forecast events (same set/answer/time)
@@ -73,48 +78,50 @@ def main(path=FILE):
    # 4) checking if answer sort order per prediction set is always {0..n-1} 
     
     grp = df.groupby("prediction set id")["answer sort order"]
-    
-    def ok_set(s):
-        
-        if s.isna().any():
-            return False
-        uniq = set(s)             
-        n = len(uniq)
-        if not (1 <= n <= 5):
-            return False
-        return uniq == set(range(n))  # exactly {0}, {0,1}, ..., {0,1,2,3,4}
-    
-    res = grp.apply(ok_set).reset_index(name="ok")
+    stats = grp.agg(["min", "max", "nunique", "size", "count"])
+    # the column turns float as soon as it has a NaN, so check for whole numbers
+    integral = df["answer sort order"].mod(1).eq(0).groupby(df["prediction set id"]).all()
+
+    # no nulls, whole numbers, and distinct values are exactly
+    # {0}, {0,1}, ..., {0,1,2,3,4} (n distinct integers from 0 to n-1)
+    ok = (
+        (stats["count"] == stats["size"])
+        & integral
+        & (stats["min"] == 0)
+        & (stats["max"] == stats["nunique"] - 1)
+        & (stats["nunique"] <= 5)
+    )
+    res = ok.reset_index(name="ok")
     
     print("\n[answer sort order per prediction question id]")
     print(f"OK: {int(res['ok'].sum())}/{len(res)}  anomalies: {int((~res['ok']).sum())}")
     
     if (~res["ok"]).any():
         # show raw distinct values (as a set) for quick inspection — no sorting
-        bad = res[~res["ok"]].merge(
-            grp.apply(lambda s: set(s)).reset_index(name="distinct_raw"),
-            on="prediction question id"
+        bad = res[~res["ok"]]
+        distinct = (
+            df[df["prediction set id"].isin(bad["prediction set id"])]
+            .groupby("prediction set id")["answer sort order"]
+            .apply(lambda s: set(s))
+            .reset_index(name="distinct_raw")
         )
+        bad = bad.merge(distinct, on="prediction set id")
         print(bad.head(10).to_string(index=False))
 
 
     # 4) Sum-to-one across answers per prediction set (exclude single-answer sets)
     print("\n[Sum-to-one by prediction set id (excluding single-answer sets)]")
     
-    tmp = df.copy()
-    tmp["__fp__"] = fp
-    
     # Keep only prediction sets that have >1 DISTINCT answers
-    if "answer id" in tmp.columns:
-        multi = tmp.groupby("prediction set id")["answer id"].transform("nunique") > 1
+    if "answer id" in df.columns:
+        multi = df.groupby("prediction set id")["answer id"].transform("nunique") > 1
     else:
         # Fallback: if 'answer id' missing, use row count
-        multi = tmp.groupby("prediction set id")["__fp__"].transform("size") > 1
-    
-    tmp = tmp[multi]
+        multi = df.groupby("prediction set id")["forecasted probability"].transform("size") > 1
     
+    # Group the probability column alone; no copy of the full frame
     sums = (
-        tmp.groupby("prediction set id", dropna=False)["__fp__"]
+        fp[multi].groupby(df.loc[multi, "prediction set id"], dropna=False)
            .sum(min_count=1)
            .reset_index(name="sum_prob")
     )
@@ -128,8 +135,8 @@ def main(path=FILE):
     
     # 5) Optional: created at <= updated at (parse only if columns exist)
     if {"created at", "updated at"}.issubset(df.columns):
-        created = pd.to_datetime(df["created at"], errors="coerce", utc=True)
-        updated = pd.to_datetime(df["updated at"], errors="coerce", utc=True)
+        created = cached_to_datetime(df["created at"], errors="coerce", utc=True)
+        updated = cached_to_datetime(df["updated at"], errors="coerce", utc=True)
         bad_time = df[created.notna() & updated.notna() & (created > updated)]
         print("\n[created at <= updated at]")
         print(f"- rows: {len(bad_time)}")
@@ -2,6 +2,27 @@
 # -*- coding: utf-8 -*-
 
 
+import numpy as np
+import pandas as pd
+
+
+def cached_to_datetime(s, **kwargs):
+    """
+    pd.to_datetime on the distinct values of `s` only, mapped back onto its rows.
+
+    Timestamps repeat massively in the raw export (every answer of a prediction
+    set shares them), so parsing the uniques is much cheaper than parsing every
+    row. Keyword arguments are passed through to pd.to_datetime.
+    """
+    codes, uniq = pd.factorize(s)
+    parsed = pd.to_datetime(uniq, **kwargs)
+    return pd.Series(
+        parsed.take(codes, allow_fill=True, fill_value=pd.NaT),
+        index=s.index,
+        name=s.name,
+    )
+
+
 def drop_unresolved_questions(df):
     """
     Clean the raw prediction rows.
@@ -34,12 +55,11 @@ def drop_unresolved_questions(df):
         .tolist()
     )
 
-    keep_q_mask = ~df["discover question id"].isin(bad_qids)
-    df_step1 = df[keep_q_mask].copy()
+    keep_q_mask = ~df["discover question id"].isin(bad_qids).to_numpy()
 
     # ---------- Step 2: drop post-resolution (after-known) forecasts ----------
     # "made after correctness known" may be bools or strings.
-    raw_col = df_step1["made after correctness known"]
+    raw_col = df["made after correctness known"]
 
     normalized_after_known = (
         raw_col
@@ -53,17 +73,12 @@ def drop_unresolved_questions(df):
     # "true" -> True
     # "false" -> False
     # anything else (including "nan") -> NaN
-    df_step1 = df_step1.assign(_made_after_known=normalized_after_known)
 
-    # rows to *drop* are those where _made_after_known is True
-    drop_mask = df_step1["_made_after_known"] == True
+    # rows to *drop* (among the kept questions) are those marked True
+    drop_mask = keep_q_mask & (normalized_after_known == True).to_numpy()
     n_after_known_removed = int(drop_mask.sum())
 
-    # keep rows that are NOT marked True
-    cleaned = (
-        df_step1[~drop_mask]
-        .drop(columns=["_made_after_known"])
-        .copy()
-    )
+    # Both steps applied with a single row take (one copy of the frame)
+    cleaned = df.take(np.flatnonzero(keep_q_mask & ~drop_mask))
 
     return cleaned, bad_qids, n_after_known_removed
@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 
 
-import pandas as pd
+import numpy as np
 from carry_forward import carry_forward_snapshots
-from ordered_brier_eval import ordered_brier_from_distribution
+from ordered_brier_eval import _check_zero_one, ordered_brier_rows
 
 
 def score_individuals(forecaster_day, *, max_staleness_days=None):
@@ -14,52 +14,50 @@ def score_individuals(forecaster_day, *, max_staleness_days=None):
     coverage_adjusted_brier = avg_brier / PR
     """
 
-    # STEP 1 — carry-forward per person/day (pass truth + cutoff through)
+    # STEP 1 — carry-forward per person/day up to correctness_known_day (if
+    # available), passing truth + cutoff through
+    cutoff_col = "correctness_known_day" if "correctness_known_day" in forecaster_day.columns else None
     snapshots = carry_forward_snapshots(
         forecaster_day,
         max_staleness_days=max_staleness_days,
         per_answer_cols=("resolved_probability",),
         per_question_cols=("correctness_known_day",),
+        per_question_day_cutoff=cutoff_col,
         downcast=True,
     )
 
-    # STEP 2 — trim to day <= correctness_known_day (if available)
-    if "correctness_known_day" in snapshots.columns:
-        m = snapshots["correctness_known_day"].notna()
-        snapshots = snapshots[(~m) | (snapshots["day"] <= snapshots["correctness_known_day"])]
-
-    # STEP 3 — complete bucket vectors per person-day (missing buckets -> 0)
+    # STEP 2 — bucket vectors per person-day, one column per answer (missing buckets -> 0)
+    by = ["discover question id", "membership guid", "day", "correctness_known_day"]
+    prob_wide = (
+        snapshots.dropna(subset=by)
+        .set_index(by + ["answer sort order"])["prob"]
+        .unstack("answer sort order", fill_value=0.0)
+    )
+    # Truth per question; NaN marks answers a question doesn't have
     answers_catalog = (
         forecaster_day[["discover question id", "answer sort order", "resolved_probability"]]
         .drop_duplicates()
-        .rename(columns={"answer sort order": "answer_sort_order"})
     )
-    snaps = snapshots.rename(columns={"answer sort order": "answer_sort_order"})
-    keys = snaps[["discover question id", "membership guid", "day", "correctness_known_day"]].drop_duplicates()
-    skeleton = keys.merge(answers_catalog, on="discover question id", how="left")
-    skeleton = skeleton.merge(
-        snaps[["discover question id", "membership guid", "day", "answer_sort_order", "prob"]],
-        on=["discover question id", "membership guid", "day", "answer_sort_order"],
-        how="left",
+    answers_catalog = answers_catalog[
+        answers_catalog["discover question id"].isin(prob_wide.index.unique("discover question id"))
+    ]
+    # Checked here, before the pivot turns a missing truth into a missing bucket
+    _check_zero_one(answers_catalog["resolved_probability"].to_numpy(dtype=float))
+    truth_wide = answers_catalog.pivot(
+        index="discover question id", columns="answer sort order", values="resolved_probability"
+    )
+    buckets = prob_wide.columns.union(truth_wide.columns)
+    prob_wide = prob_wide.reindex(columns=buckets, fill_value=0.0)
+    truth_rows = truth_wide.reindex(
+        index=prob_wide.index.get_level_values("discover question id"), columns=buckets
     )
-    skeleton["prob"] = skeleton["prob"].fillna(0.0)
-
-    # STEP 4 — Ordered Brier per person-day; then average per (qid, guid)
-    by = ["discover question id", "membership guid", "day", "correctness_known_day"]
-
-    def _obrier(g):
-        g = g.sort_values("answer_sort_order")
-        return ordered_brier_from_distribution(
-            g["prob"].to_numpy(dtype=float),
-            g["resolved_probability"].to_numpy(dtype=float),
-        )
 
-    daily = (
-        skeleton.groupby(by, as_index=False)
-        .apply(lambda g: pd.Series({"brier": _obrier(g)}))
-        .reset_index(drop=True)
-        .sort_values(by)
+    # STEP 3 — Ordered Brier per person-day; then average per (qid, guid)
+    daily = prob_wide.index.to_frame(index=False)
+    daily["brier"] = ordered_brier_rows(
+        prob_wide.to_numpy(dtype=np.float32), truth_rows.to_numpy(dtype=np.float32)
     )
+    daily = daily.sort_values(by).reset_index(drop=True)
 
     per_guid_per_question = (
         daily.groupby(["discover question id", "membership guid"], as_index=False)
@@ -67,7 +65,7 @@ def score_individuals(forecaster_day, *, max_staleness_days=None):
         .sort_values(["discover question id", "membership guid"])
     )
 
-    # STEP 5 — Participation Rate and coverage-adjusted score
+    # STEP 4 — Participation Rate and coverage-adjusted score
     # Question start day (calendar) ≈ earliest observed day for that question
     q_start = (
         forecaster_day.groupby("discover question id", as_index=False)
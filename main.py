@@ -4,7 +4,7 @@
 
 
 import pandas as pd
-from data_cleaner import drop_unresolved_questions
+from data_cleaner import cached_to_datetime, drop_unresolved_questions
 from baserate_filter import filter_by_rationale
 
 from pipeline import run_aggregate_variant, run_aggregate_with_trimming
@@ -12,6 +12,25 @@ from pipeline import run_aggregate_variant, run_aggregate_with_trimming
 
 INPUT_FILE = "rct-a-prediction-sets.csv"
 
+# Only the columns the pipeline touches, parsed straight into compact dtypes
+USE_COLS = [
+    "prediction set id",
+    "discover question id",
+    "membership guid",
+    "created at",
+    "answer sort order",
+    "forecasted probability",
+    "answer resolved probability",
+    "answer correctness_known_at",
+    "made after correctness known",
+    "rationale",
+]
+DTYPES = {
+    "forecasted probability": "float32",
+    "answer resolved probability": "float32",
+    "answer sort order": "Int8",  # nullable: blank cells load as <NA>
+}
+
 
 
 
@@ -19,7 +38,7 @@ def main():
     # -----------------------------------------------------------
     # 1. Load csv + drop unresolved questions and rows where the forecast was made late
     # -----------------------------------------------------------
-    df = pd.read_csv(INPUT_FILE)
+    df = pd.read_csv(INPUT_FILE, usecols=USE_COLS, dtype=DTYPES)
     cleaned_df, removed_ids, n_after_known_removed = drop_unresolved_questions(df)
 
     # Cleanup summary prints
@@ -36,24 +55,22 @@ def main():
     # -------------------------------------------------
     # 2. Parse timestamps and define 'day' as the floor of created at
     # -------------------------------------------------
-    cleaned_df["created at"] = pd.to_datetime(cleaned_df["created at"], utc=True, errors="coerce")
+    cleaned_df["created at"] = cached_to_datetime(cleaned_df["created at"], utc=True, errors="coerce")
     cleaned_df["day"] = cleaned_df["created at"].dt.floor("D")
 
     # -------------------------------------------------
     # 3. Get each forecaster's final prediction set per day as instructed
     # -------------------------------------------------
-    sets = (
+    latest_sets = (
         cleaned_df[
             ["prediction set id", "discover question id", "membership guid", "day", "created at"]
         ]
-        .drop_duplicates()
         .sort_values(
-            ["discover question id", "membership guid", "day", "created at", "prediction set id"]
+            ["discover question id", "membership guid", "day", "created at", "prediction set id"],
+            kind="stable",
         )
+        .drop_duplicates(["discover question id", "membership guid", "day"], keep="last")
     )
-    latest_sets = sets.groupby(["discover question id", "membership guid", "day"], as_index=False).tail(1)
-    latest_set_ids = set(latest_sets["prediction set id"])
-    latest_rows = cleaned_df[cleaned_df["prediction set id"].isin(latest_set_ids)].copy()
 
     # -------------------------------------------------
     # 4. Creating the dataframe we will work with (forecaster_day)
@@ -69,19 +86,25 @@ def main():
         "answer resolved probability",
         "answer correctness_known_at",
     ]
+    # Semi-join on the latest set ids (hash join, no per-row Python set lookups)
+    latest_rows = cleaned_df[["prediction set id"] + cols].merge(
+        latest_sets[["prediction set id"]].drop_duplicates(),
+        on="prediction set id",
+        how="inner",
+    )
     forecaster_day = latest_rows[cols].rename(
         columns={
             "forecasted probability": "prob",
             "answer resolved probability": "resolved_probability",
         }
-    ).copy()
+    )
     
     #There are 5 questions with 2 correctness known at dates, we make the call
     #of keeping this data and keeping the earliest of the two correctness known
     #at dates. This is what the code below does .
     
     # Parse correctness-known timestamps and take the EARLIEST per question
-    ck_day = pd.to_datetime(
+    ck_day = cached_to_datetime(
         forecaster_day["answer correctness_known_at"], utc=True, errors="coerce"
     ).dt.floor("D")
     
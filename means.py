@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 
+import math
+
 import numpy as np
 
 
@@ -11,6 +13,50 @@ import numpy as np
 EPS = 1e-5  
 
 
+def _as_float_array(probs):
+    """
+    Probabilities as a float array. float32 input (the carried-forward
+    snapshots) stays float32 so np.log/np.exp run their wider SIMD float32
+    loops (numpy >= 1.19 dispatches AVX2/AVX-512 automatically); anything else
+    becomes float64. Callers accumulate means in float64 either way, and the
+    log-odds are always taken in float64.
+    Contiguous float arrays are returned as is (no copy); callers never write
+    into the result.
+    """
+    if (
+        isinstance(probs, np.ndarray)
+        and probs.dtype in (np.float32, np.float64)
+        and probs.flags.c_contiguous
+    ):
+        return probs
+    arr = np.asarray(probs)
+    return np.ascontiguousarray(arr, dtype=np.float32 if arr.dtype == np.float32 else np.float64)
+
+
+def _clip_bounds(arr):
+    # EPS and 1 - EPS in the array's own dtype, so clipping doesn't upcast
+    return arr.dtype.type(EPS), arr.dtype.type(1 - EPS)
+
+
+def _log_clipped(arr):
+    # log(p) with p clipped to avoid 0 and 1 edge issues; the clip goes into a
+    # fresh buffer (arr may be the caller's) and the log runs in place on it
+    buf = np.clip(arr, *_clip_bounds(arr))
+    return np.log(buf, out=buf)
+
+
+def _log_odds_clipped(arr):
+    # log(p / (1 - p)) = log(p) - log1p(-p) on clipped p; log1p stays accurate
+    # for p near 1 where 1 - p loses digits, and there is no odds divide.
+    # Always float64: the odds blow up near p = 1, so the upper clip must be
+    # exactly 1 - EPS (float32 rounds it to 0.99998999) for 100% forecasts
+    # to land where they always did.
+    buf = np.clip(arr.astype(np.float64), EPS, 1 - EPS)
+    log_one_minus = np.log1p(-buf)
+    np.log(buf, out=buf)
+    return np.subtract(buf, log_one_minus, out=buf)
+
+
 def geometric_mean_prob(probs):
     """
     Geometric mean of probabilities.
@@ -21,7 +67,7 @@ def geometric_mean_prob(probs):
     - If any probability is 0, returns 0.0
     - If any probability is <0, returns NaN (invalid for a probability)
     """
-    arr = np.asarray(probs, dtype=float)
+    arr = _as_float_array(probs)
 
     # basic validation
     if arr.size == 0:
@@ -30,12 +76,9 @@ def geometric_mean_prob(probs):
         return np.nan
 
     
-    # clip to avoid 0 and 1 edge issues
-    arr = np.clip(arr, EPS, 1 - EPS)
-
-    # standard geometric mean using log/exp
+    # standard geometric mean of the clipped probs using log/exp
     # geo_mean = exp(mean(log(p)))
-    return float(np.exp(np.log(arr).mean()))
+    return math.exp(float(_log_clipped(arr).mean(dtype=np.float64)))
 
 
 def trimmed_mean_prob(probs, trim_frac=0.1):
@@ -51,26 +94,26 @@ def trimmed_mean_prob(probs, trim_frac=0.1):
       it just won't over-trim; it'll fall back to using whatever remains.
     - Returns NaN if no values.
     """
-    arr = np.asarray(probs, dtype=float)
+    arr = _as_float_array(probs)
 
     if arr.size == 0:
         return np.nan
 
-    # sort ascending
-    arr = np.sort(arr)
-
     # how many to cut off each tail
-    k = int(np.floor(arr.size * trim_frac))
+    n = arr.size
+    k = int(np.floor(n * trim_frac))
     
     #print(k)
 
-    # if trimming both sides would delete everything, don't trim
-    if k * 2 >= arr.size:
+    # if trimming both sides would delete everything (or nothing), don't trim
+    if k == 0 or k * 2 >= n:
         trimmed = arr
     else:
-        trimmed = arr[k: arr.size - k]
+        # partial sort: only positions k and n-k-1 need to land in sorted
+        # place, everything between them is the kept middle (O(n), no full sort)
+        trimmed = np.partition(arr, [k, n - k - 1])[k: n - k]
 
-    return float(trimmed.mean())
+    return float(trimmed.mean(dtype=np.float64))
 
 
 def geometric_mean_odds(probs):
@@ -88,7 +131,7 @@ def geometric_mean_odds(probs):
 
     Returned value is the geometric mean of odds (not converted back to a probability).
     """
-    arr = np.asarray(probs, dtype=float)
+    arr = _as_float_array(probs)
 
     if arr.size == 0:
         return np.nan
@@ -98,18 +141,8 @@ def geometric_mean_odds(probs):
         return np.nan
 
 
-    # clip to avoid 0 and 1 edge issues
-    arr = np.clip(arr, EPS, 1 - EPS)
-
-
-    # convert to odds
-    odds = arr / (1.0 - arr)
-    
-    #print(odds)
-    
-    
-    # geometric mean of the odds (log-space for stability)
-    o_geo = float(np.exp(np.log(odds).mean()))
+    # geometric mean of the clipped odds (log-space for stability)
+    o_geo = math.exp(float(_log_odds_clipped(arr).mean(dtype=np.float64)))
 
     # convert geometric-mean odds back to probability
     p_geo = o_geo / (1.0 + o_geo)
@@ -119,6 +152,53 @@ def geometric_mean_odds(probs):
     return float(p_geo)
 
 
+# ---------------------------
+# Grouped versions
+# ---------------------------
+
+# Same rules as the helpers above, for many groups at once: `probs` is a flat
+# array of values and `codes` the group (0 .. n_groups-1) of each value, e.g.
+# from groupby(...).ngroup(). One transform over all values plus a bincount
+# replaces one Python call per group.
+
+def geometric_mean_prob_by_group(probs, codes, n_groups):
+    """geometric_mean_prob for every group; returns a float64 array of n_groups."""
+    arr = _as_float_array(probs)
+    n = np.bincount(codes, minlength=n_groups)
+    out = np.exp(np.bincount(codes, weights=_log_clipped(arr), minlength=n_groups) / n)
+    out[np.bincount(codes, weights=arr < 0, minlength=n_groups) > 0] = np.nan
+    return out
+
+
+def geometric_mean_odds_by_group(probs, codes, n_groups):
+    """geometric_mean_odds for every group; returns a float64 array of n_groups."""
+    arr = _as_float_array(probs)
+    n = np.bincount(codes, minlength=n_groups)
+    o_geo = np.exp(np.bincount(codes, weights=_log_odds_clipped(arr), minlength=n_groups) / n)
+    out = o_geo / (1.0 + o_geo)
+    out[np.bincount(codes, weights=(arr < 0) | (arr > 1), minlength=n_groups) > 0] = np.nan
+    return out
+
+
+def trimmed_mean_prob_by_group(probs, codes, n_groups, trim_frac=0.1):
+    """trimmed_mean_prob for every group; returns a float64 array of n_groups."""
+    arr = _as_float_array(probs)
+    n = np.bincount(codes, minlength=n_groups)
+
+    # how many to cut off each tail; no trimming where it would delete everything
+    k = np.floor(n * trim_frac).astype(np.int64)
+    k[k * 2 >= n] = 0
+
+    # rank of each value within its group (one sort by group, then value)
+    order = np.lexsort((arr, codes))
+    sorted_codes = codes[order]
+    rank = np.arange(len(order)) - (np.cumsum(n) - n)[sorted_codes]
+    keep = (rank >= k[sorted_codes]) & (rank < (n - k)[sorted_codes])
+
+    kept_sum = np.bincount(sorted_codes[keep], weights=arr[order][keep], minlength=n_groups)
+    return kept_sum / (n - 2 * k)
+
+
 
 # test =[2,2,4,8,2,0,0,8,0,8]
 
@@ -14,8 +14,11 @@ def ordered_brier_from_distribution(probs: np.ndarray,
     Assumes hard resolution: exactly one category is the true outcome.
     """
 
-    probs = np.asarray(probs, dtype=float)
-    outcome = np.asarray(outcome, dtype=float)
+    # float32 forecasts stay float32 (the core accumulates in float64)
+    probs = np.asarray(probs)
+    if probs.dtype != np.float32:
+        probs = probs.astype(np.float64, copy=False)
+    outcome = np.asarray(outcome, dtype=probs.dtype)
 
     if probs.ndim != 1 or outcome.ndim != 1:
         raise ValueError("probs and outcome must be 1-D arrays.")
@@ -24,50 +27,63 @@ def ordered_brier_from_distribution(probs: np.ndarray,
 
     K = probs.shape[0]
 
-    # If only one bucket was provided, construct the implicit complement.
+    # ---- STRICT CHECK: outcome must be exactly one-hot ----
+    # Requirements:
+    # - All entries are either 0 or 1 (no other values)
+    # - Exactly one entry is 1 (a single bucket only needs to be 0 or 1)
+    # - Everything else is 0
+    _check_one_hot(outcome, outcome.sum(), K)
+
+    # If only one bucket was provided, it stands for the implicit complement.
     # Example input:
     #   probs   = [0.6]
     #   outcome = [1]
-    # becomes:
+    # means:
     #   probs   = [0.6, 0.4]
     #   outcome = [1.0, 0.0]
-    if K == 1:
-        p = probs[0]
-        y = outcome[0]
-        probs = np.array([p, 1.0 - p], dtype=float)
-        outcome = np.array([y, 1.0 - y], dtype=float)
-        K = 2
+    # which has a single split, so the score is just 2 * (p - y)^2.
+    return float(_ordered_brier_fixed_k(probs.copy(), np.cumsum(outcome)))
 
-    # ---- STRICT CHECK: outcome must be exactly one-hot ----
-    # Requirements:
-    # - All entries are either 0 or 1 (no other values)
-    # - Exactly one entry is 1
-    # - Everything else is 0
-    unique_vals = np.unique(outcome)
 
+def _check_zero_one(truth):
+    """Raise unless every truth entry is 0 or 1 (NaN included)."""
     # Rule 1: outcome can ONLY contain 0 and/or 1
-    if not np.all(np.isin(unique_vals, [0.0, 1.0])):
-        raise ValueError(
-            "Outcome must be one-hot: entries must be 0 or 1 only."
-        )
+    if not ((truth == 0) | (truth == 1)).all():
+        raise ValueError("Outcome must be one-hot: entries must be 0 or 1 only.")
+
+
+def _check_one_hot(truth, n_ones, n_buckets):
+    """
+    Raise unless every truth entry is 0 or 1 and every forecast has exactly
+    one 1; a single bucket [y] (the implicit complement) may also be all 0.
+    `n_ones` and `n_buckets` are per forecast (scalars or arrays).
+    """
+    _check_zero_one(truth)
 
     # Rule 2: exactly one 1
-    if np.sum(outcome == 1.0) != 1:
-        raise ValueError(
-            "Outcome must be one-hot: exactly one category must be 1."
-        )
+    if np.any((n_ones != 1) & (n_buckets != 1)):
+        raise ValueError("Outcome must be one-hot: exactly one category must be 1.")
+
+
+def _ordered_brier_core(probs, cum_truth, valid):
+    """
+    Ordered Brier along the last axis for truth that is already validated and
+    passed as its cumsum. `valid` marks the buckets each row has (probs must be
+    0 elsewhere); leading axes of `probs` broadcast against it, so one truth
+    scores several forecasts. Renormalizes `probs` in place.
+    Works in the probs' float dtype; the mean is accumulated in float64.
+    """
+    n_buckets = valid.sum(axis=-1, keepdims=True)
 
     # We do NOT renormalize outcome (truth is exact), but we DO
     # gently renormalize forecast probs in case they don't sum to 1 exactly.
-    psum = probs.sum()
-    if psum > 0:
-        probs = probs / psum
+    # A single bucket [p] stands for [p, 1-p] and is left as is.
+    single = n_buckets == 1
+    psum = probs.sum(axis=-1, keepdims=True)
+    np.divide(probs, psum, out=probs, where=~single & (psum > 0))
 
-    # cumulative forecast and cumulative truth
-    cum_forecast = np.cumsum(probs)   # length K
-    cum_truth   = np.cumsum(outcome)  # length K
-
-    # For each boundary j = 0 .. K-2, make a binary split:
+    # For each boundary j = 0 .. K-2 (or the single bucket's own split), make
+    # a binary split:
     #   left side = categories <= j
     #   right side = categories > j
     # predicted "yes" prob at split j = cum_forecast[j]
@@ -77,56 +93,67 @@ def ordered_brier_from_distribution(probs: np.ndarray,
     #   (p_yes - y_yes)^2 + (p_no - y_no)^2
     # which simplifies to:
     #   2 * (p_yes - y_yes)^2
-    diffsq = (cum_forecast[:-1] - cum_truth[:-1]) ** 2
-    brier_per_split = 2.0 * diffsq
+    last = valid & (valid.cumsum(axis=-1) == n_buckets)
+    split = valid & (~last | single)
+    sq = 2 * (probs.cumsum(axis=-1) - cum_truth) ** 2
 
     # Ordered Brier score = average across splits
-    score = brier_per_split.mean()
-
-    return float(score)
-
+    return (sq * split).sum(axis=-1, dtype=np.float64) / split.sum(axis=-1)
 
 
-def _score_one_day(group: pd.DataFrame):
+def _ordered_brier_fixed_k(probs, cum_truth):
     """
-    Helper: given a subset of agg for ONE (discover question id, day),
-    compute ordered Brier score for each aggregation method.
+    _ordered_brier_core for rows that all have the same K buckets: no
+    padding, so no bucket masks. K == 1 is the single split 2 * (p - y)^2.
+    Used for single forecasts and for equal-K blocks of aggregate groups.
+    Renormalizes `probs` in place.
+    """
+    K = probs.shape[-1]
+    if K == 1:
+        return 2 * (probs[..., 0] - cum_truth[..., 0]).astype(np.float64) ** 2
 
-    group is expected to have columns:
-        "answer_sort_order"
-        "mean_probability"
-        "median_probability"
-        "trimmed_mean_probability"
-        "geometric_mean_probability"
-        "geometric_mean_odds"
-        "resolved_probability"
+    psum = probs.sum(axis=-1, keepdims=True)
+    np.divide(probs, psum, out=probs, where=psum > 0)
+    diff = probs.cumsum(axis=-1)[..., :-1] - cum_truth[..., :-1]
+    return 2 * (diff ** 2).sum(axis=-1, dtype=np.float64) / (K - 1)
 
-    Returns a dict with that day's scores.
+
+def _validated_truth_rows(truth):
+    """
+    Check a (rows x buckets) truth matrix, NaN for buckets the row's question
+    doesn't have, is one-hot per row. Returns the bucket mask and the
+    cumulative truth for _ordered_brier_core.
     """
+    valid = ~np.isnan(truth)
+    truth = np.where(valid, truth, truth.dtype.type(0))  # missing buckets count as 0
+    _check_one_hot(truth, truth.sum(axis=1), valid.sum(axis=1))
 
-    # sort answers in their ordinal order
-    g = group.sort_values("answer_sort_order")
+    return valid, truth.cumsum(axis=1)
 
-    # ground truth vector in order
-    outcome = g["resolved_probability"].to_numpy(dtype=float)
 
-    # build forecast vectors for each aggregation method
-    mean_p = g["mean_probability"].to_numpy(dtype=float)
-    median_p = g["median_probability"].to_numpy(dtype=float)
-    trimmed_p = g["trimmed_mean_probability"].to_numpy(dtype=float)
-    geom_p = g["geometric_mean_probability"].to_numpy(dtype=float)
-    geom_odds_p = g["geometric_mean_odds"].to_numpy(dtype=float)
+def ordered_brier_rows(probs: np.ndarray, truth: np.ndarray) -> np.ndarray:
+    """
+    Ordered Brier per row of a (forecasts x buckets) matrix, vectorized over
+    all rows at once. `truth` is NaN for buckets the row's question doesn't have.
+    Works in the inputs' float dtype (float32 halves the memory traffic); the
+    per-row mean is accumulated in float64.
+    Same math as ordered_brier_from_distribution: a single bucket gets the
+    implicit complement, truth must be one-hot, forecasts are renormalized when
+    they sum to > 0.
+    """
+    valid, cum_truth = _validated_truth_rows(truth)
+    probs = np.where(valid, probs, probs.dtype.type(0))
+    return _ordered_brier_core(probs, cum_truth, valid)
 
-    return {
-        "obs_mean": ordered_brier_from_distribution(mean_p, outcome),
-        "obs_median": ordered_brier_from_distribution(median_p, outcome),
-        "obs_trimmed": ordered_brier_from_distribution(trimmed_p, outcome),
-        "obs_geom_prob": ordered_brier_from_distribution(geom_p, outcome),
-        "obs_geom_odds": ordered_brier_from_distribution(geom_odds_p, outcome),
-        # carry some metadata for grouping later
-        "discover question id": g["discover question id"].iloc[0],
-        "day": g["day"].iloc[0],
-    }
+
+# Output score column -> aggregate probability column it scores
+_SCORE_COLS = {
+    "obs_mean": "mean_probability",
+    "obs_median": "median_probability",
+    "obs_trimmed": "trimmed_mean_probability",
+    "obs_geom_prob": "geometric_mean_probability",
+    "obs_geom_odds": "geometric_mean_odds",
+}
 
 
 def compute_ordered_brier_for_aggregates(agg_df: pd.DataFrame) -> pd.DataFrame:
@@ -162,14 +189,44 @@ def compute_ordered_brier_for_aggregates(agg_df: pd.DataFrame) -> pd.DataFrame:
       - or average within each question.
     """
 
-    results = []
-    for (qid, day), sub in agg_df.groupby(["discover question id", "day"]):
-        res = _score_one_day(sub)
-        results.append(res)
-
-    day_scores = pd.DataFrame(results).sort_values(
-        ["discover question id", "day"]
-    ).reset_index(drop=True)
+    keys = ["discover question id", "day"]
+
+    # One global sort (skipped when the frame already comes sorted from the
+    # aggregator); each (qid, day) group is then a contiguous run of rows.
+    order = keys + ["answer_sort_order"]
+    df = agg_df.dropna(subset=keys)
+    if not pd.MultiIndex.from_frame(df[order]).is_monotonic_increasing:
+        df = df.sort_values(order, kind="stable")
+
+    # Segment offsets straight from the sorted keys: a group starts wherever
+    # the (qid, day) pair changes
+    qid = pd.factorize(df["discover question id"])[0]
+    day = pd.factorize(df["day"])[0]
+    starts_group = np.ones(len(df), dtype=bool)
+    starts_group[1:] = (qid[1:] != qid[:-1]) | (day[1:] != day[:-1])
+    starts = np.flatnonzero(starts_group)
+    gid = np.cumsum(starts_group) - 1
+    n_buckets = np.diff(starts, append=len(df))
+
+    # float32 throughout (the aggregates are stored as float32 anyway); the
+    # scores are accumulated in float64
+    probs = df[list(_SCORE_COLS.values())].to_numpy(dtype=np.float32)
+    truth = df["resolved_probability"].to_numpy(dtype=np.float32)
+
+    # ---- STRICT CHECK: outcome must be exactly one-hot (once per group) ----
+    _check_one_hot(truth, np.bincount(gid, weights=truth, minlength=len(starts)), n_buckets)
+
+    # Score all groups with the same bucket count K together as exact
+    # (methods x groups x K) blocks; there are only a handful of distinct K
+    scores = np.empty((len(_SCORE_COLS), len(starts)))
+    for K in np.unique(n_buckets):
+        groups = np.flatnonzero(n_buckets == K)
+        rows = starts[groups, None] + np.arange(K)
+        scores[:, groups] = _ordered_brier_fixed_k(probs.T[:, rows], truth[rows].cumsum(axis=1))
+
+    day_scores = pd.DataFrame(scores.T, columns=list(_SCORE_COLS))
+    # Groups come out in sorted (qid, day) order already
+    day_scores[keys] = df[keys].take(starts).reset_index(drop=True)
 
     return day_scores
 
@@ -191,7 +248,7 @@ def summarize_ordered_brier(day_scores: pd.DataFrame) -> pd.DataFrame:
     # per-question average
     by_q = (
         day_scores
-        .groupby("discover question id", as_index=False)[
+        .groupby("discover question id", as_index=False, observed=True)[
             ["obs_mean", "obs_median", "obs_trimmed",
              "obs_geom_prob", "obs_geom_odds"]
         ]
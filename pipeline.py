@@ -9,6 +9,7 @@
 # pipelines.py
 import math
 
+import numpy as np
 import pandas as pd
 
 from carry_forward import carry_forward_snapshots
@@ -23,6 +24,13 @@ from build_table import build_paper_table
 # ---------------------------
 
 
+def _as_utc_datetime(s):
+    """pd.to_datetime(s, utc=True, errors="coerce"), skipped if s already holds UTC datetimes."""
+    if isinstance(s.dtype, pd.DatetimeTZDtype) and str(s.dtype.tz) == "UTC":
+        return s
+    return pd.to_datetime(s, utc=True, errors="coerce")
+
+
 
 # This function convert a compact per-forecaster/per-day table (`forecaster_day`) into
 #   a full set of per-day “snapshots” by carrying each forecaster’s last
@@ -51,8 +59,7 @@ def _run_aggregate_from_snapshots(snapshots, *, label, agg_out_base="question_da
 
     # Sanity: (qid, day) sums ~ 1
     sums = agg.groupby(["discover question id", "day"], observed=True)["mean_probability"].sum()
-    off = (sums - 1.0).abs()
-    n_off = int((off > 3e-2).sum())
+    n_off = int(np.count_nonzero(np.abs(sums.to_numpy(dtype=float) - 1.0) > 3e-2))
     if n_off:
         print(f"[{label}] Note: {n_off} question-day groups do not sum exactly to 1 (tol=3e-2).")
 
@@ -161,20 +168,18 @@ def run_aggregate_with_trimming(
     _, per_q_guid, _ = score_individuals(train, max_staleness_days=max_staleness_days)
 
     # --- Participation rate components (question calendar) ---
-    # Ensure datetimes (guard against object dtypes)
-    train["day"] = pd.to_datetime(train["day"], utc=True, errors="coerce")
-    train["correctness_known_day"] = pd.to_datetime(train["correctness_known_day"], utc=True, errors="coerce")
-
-    # Per-question calendar: start day and correctness-known day
-    q_start = (
-        train.groupby("discover question id", as_index=False, observed=True)
-             .agg(question_start_day=("day", "min"))
+    # Ensure datetimes (guard against object dtypes; no re-parse if already UTC)
+    train["day"] = _as_utc_datetime(train["day"])
+    train["correctness_known_day"] = _as_utc_datetime(train["correctness_known_day"])
+
+    # Per-question calendar: start day and correctness-known day. The results
+    # are only looked up by question id, so group once, unsorted, and reuse
+    # the grouper for the span fallback below.
+    by_question = train.groupby("discover question id", as_index=False, observed=True, sort=False)
+    q_cal = by_question.agg(
+        question_start_day=("day", "min"),
+        correctness_known_day=("correctness_known_day", "max"),
     )
-    q_total = (
-        train.groupby("discover question id", as_index=False, observed=True)
-             .agg(correctness_known_day=("correctness_known_day", "max"))
-    )
-    q_cal = q_start.merge(q_total, on="discover question id", how="inner")
     # Total days in the training window, inclusive
     q_cal["total_days"] = (q_cal["correctness_known_day"] - q_cal["question_start_day"]).dt.days + 1
 
@@ -189,10 +194,8 @@ def run_aggregate_with_trimming(
 
     # Fallback for any NaNs: compute span from observed training days
     if per_q_guid["total_days"].isna().any():
-        span = (
-            train.groupby("discover question id", as_index=False, observed=True)
-                 .agg(span_days=("day", lambda s: (s.max() - s.min()).days + 1))
-        )
+        span = by_question.agg(first_day=("day", "min"), last_day=("day", "max"))
+        span["span_days"] = (span["last_day"] - span["first_day"]).dt.days + 1
         span_map = span.set_index("discover question id")["span_days"]
         per_q_guid["total_days"] = per_q_guid["total_days"].fillna(
             per_q_guid["discover question id"].map(span_map)
@@ -217,22 +220,26 @@ def run_aggregate_with_trimming(
         print("[trim] No eligible forecasters to trim. Skipping trimming.")
         excluded_guids = set()
     else:
+        # Guid-sorted groups, as before: ties in the ranking keep that order
         eligible_mean = (
-            eligible.groupby("membership guid", as_index=False, observed=True)
-                    .agg(score=("coverage_adjusted_brier", "mean"))
+            eligible.groupby("membership guid", observed=True)["coverage_adjusted_brier"].mean()
         )
         n_trim = max(1, math.floor(bottom_frac_to_trim * len(eligible_mean)))
-        worst = eligible_mean.sort_values("score", ascending=False).head(n_trim)
-        excluded_guids = set(worst["membership guid"])
+        worst = eligible_mean.sort_values(ascending=False).head(n_trim)
+        excluded_guids = set(worst.index)
         print(f"[trim] Excluding {len(excluded_guids)} forecasters (bottom {bottom_frac_to_trim:.0%} performance) from continuation.")
        
 
     # C) Build snapshots for the whole period; drop excluded AFTER freeze day
     snapshots_full = _build_snapshots(forecaster_day, max_staleness_days)
     if excluded_guids:
-        mask_drop = (snapshots_full["day"] > freeze_day) & (snapshots_full["membership guid"].isin(excluded_guids))
+        # Only post-freeze rows can be dropped, so only their guids get hashed
+        post = np.flatnonzero((snapshots_full["day"] > freeze_day).to_numpy())
+        excluded = snapshots_full["membership guid"].take(post).isin(excluded_guids).to_numpy()
+        mask_drop = np.zeros(len(snapshots_full), dtype=bool)
+        mask_drop[post[excluded]] = True
         n_before = len(snapshots_full)
-        snapshots_full = snapshots_full.loc[~mask_drop].copy()
+        snapshots_full = snapshots_full.take(np.flatnonzero(~mask_drop))
         print(f"[trim] Dropped {n_before - len(snapshots_full):,} snapshot rows post-freeze for excluded forecasters.")
 
     # D) Run the shared core on the trimmed snapshots